@@ -2,7 +2,7 @@ from collections import defaultdict
 from collections.abc import MutableMapping
 import enum
 import itertools
-from typing import BinaryIO, DefaultDict, List, Tuple, Union, Optional
+from typing import BinaryIO, DefaultDict, Iterable, List, Tuple, Union, Optional
 
 import numpy as np
 import h5py
@@ -251,6 +251,328 @@ class AgentBufferField(list):
         return np.array(self)
 
 
+class ColumnarAgentBufferField:
+    """
+    ColumnarAgentBufferField has the same interface as AgentBufferField, but stores all of its
+    entries in one contiguous, growable numpy array instead of a list of per-step arrays. The live
+    entries are the rows between a read head and a write head, so truncating the oldest entries only
+    moves the read head, and slices are views onto the same storage. Entries that can't be stacked
+    (e.g. the List[np.ndarray] of group entries) are kept in an object array.
+    """
+
+    INITIAL_CAPACITY = 64
+
+    def __init__(self, data: Optional[Iterable[BufferEntry]] = None):
+        self.padding_value = 0
+        self._data: Optional[np.ndarray] = None
+        self._start = 0
+        self._end = 0
+        # Slices share their parent's storage, and copy it before they write to it.
+        self._owns_data = True
+        if data is not None:
+            self.extend(data)
+
+    @classmethod
+    def _view(cls, array: np.ndarray, padding_value: float) -> "ColumnarAgentBufferField":
+        field = cls()
+        field._data = array
+        field._end = len(array)
+        field._owns_data = False
+        field.padding_value = padding_value
+        return field
+
+    @property
+    def values(self) -> np.ndarray:
+        """
+        The live entries of this field as a numpy array, without copying.
+        """
+        if self._data is None:
+            return np.empty(0)
+        return self._data[self._start : self._end]
+
+    @property
+    def capacity(self) -> int:
+        """
+        The number of entries that can be stored before the storage needs to be reallocated.
+        """
+        return 0 if self._data is None else len(self._data)
+
+    @property
+    def _is_object(self) -> bool:
+        return self._data is not None and self._data.dtype == object
+
+    def __str__(self) -> str:
+        return f"ColumnarAgentBufferField: {list(self)}"
+
+    def __len__(self) -> int:
+        return self._end - self._start
+
+    def __iter__(self):
+        return iter(self.values)
+
+    def __array__(self, dtype=None):
+        if dtype is None:
+            return self.values
+        return self.values.astype(dtype, copy=False)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return self._view(self.values[index], self.padding_value)
+        if isinstance(index, (int, np.integer)):
+            return self.values[index]
+        return self.take(index)
+
+    def __setitem__(self, index, value) -> None:
+        if isinstance(index, slice) and index == slice(None):
+            self.set(value)
+            return
+        self._ensure_owned()
+        self.values[index] = value
+
+    @property
+    def contains_lists(self) -> bool:
+        """
+        Checks whether this ColumnarAgentBufferField contains List[np.ndarray].
+        """
+        return len(self) > 0 and self._is_object and isinstance(self[0], list)
+
+    def _ensure_owned(self) -> None:
+        if not self._owns_data:
+            self._data = self.values.copy()
+            self._start, self._end = 0, len(self._data)
+            self._owns_data = True
+
+    def _allocate(self, capacity: int, row_shape: Tuple[int, ...], dtype) -> None:
+        new_data = np.empty((capacity,) + row_shape, dtype=dtype)
+        live = len(self)
+        if live > 0:
+            new_data[:live] = self.values
+        self._data = new_data
+        self._start, self._end = 0, live
+        self._owns_data = True
+
+    def _reserve(self, n_new: int) -> None:
+        """
+        Makes room for n_new entries after the write head, either by moving the live entries
+        to the front of the storage or by growing it.
+        """
+        if self._end + n_new <= self.capacity and self._owns_data:
+            return
+        live = len(self)
+        if live + n_new <= self.capacity and self._owns_data:
+            # There is enough room in front of the read head.
+            self._data[:live] = self.values  # type: ignore
+            self._start, self._end = 0, live
+        else:
+            capacity = max(2 * self.capacity, live + n_new, self.INITIAL_CAPACITY)
+            self._allocate(capacity, self._data.shape[1:], self._data.dtype)  # type: ignore
+
+    def _convert_to_objects(self) -> None:
+        """
+        Switch to object storage, e.g. when the entries don't all have the same shape.
+        """
+        rows = list(self.values)
+        self._data = np.empty(max(self.capacity, self.INITIAL_CAPACITY), dtype=object)
+        self._start, self._end = 0, 0
+        self._owns_data = True
+        for row in rows:
+            self._data[self._end] = row
+            self._end += 1
+
+    def _append_objects(self, elements: List[BufferEntry]) -> None:
+        if not self._is_object:
+            self._convert_to_objects()
+        self._reserve(len(elements))
+        for element in elements:
+            self._data[self._end] = element  # type: ignore
+            self._end += 1
+
+    def _append_array(self, array: np.ndarray) -> None:
+        """
+        Appends a stacked array of entries, where the first dimension indexes the entries.
+        """
+        if self._data is None:
+            self._allocate(
+                max(len(array), self.INITIAL_CAPACITY), array.shape[1:], array.dtype
+            )
+        elif self._is_object:
+            self._append_objects(list(array))
+            return
+        elif array.shape[1:] != self._data.shape[1:]:
+            self._append_objects(list(array))
+            return
+        elif array.dtype != self._data.dtype:
+            self._data = self._data.astype(
+                np.promote_types(self._data.dtype, array.dtype)
+            )
+        self._reserve(len(array))
+        self._data[self._end : self._end + len(array)] = array  # type: ignore
+        self._end += len(array)
+
+    def append(self, element: BufferEntry, padding_value: float = 0.0) -> None:
+        """
+        Adds an element to this field. Also lets you change the padding
+        type, so that it can be set on append (e.g. action_masks should
+        be padded with 1.)
+        :param element: The element to append to the field.
+        :param padding_value: The value used to pad when get_batch is called.
+        """
+        self.padding_value = padding_value
+        if isinstance(element, list) or self._is_object:
+            self._append_objects([element])
+        else:
+            self._append_array(np.asanyarray(element)[np.newaxis])
+
+    def extend(self, data: Iterable[BufferEntry]) -> None:
+        """
+        Adds all of the elements of data to this field.
+        :param data: A stacked numpy array, another field, or an iterable of entries.
+        """
+        if isinstance(data, ColumnarAgentBufferField):
+            data = data.values
+        if isinstance(data, np.ndarray) and data.dtype != object:
+            self._append_array(data)
+            return
+        elements = list(data)
+        if not elements:
+            return
+        if self._is_object or isinstance(elements[0], list):
+            self._append_objects(elements)
+            return
+        try:
+            stacked = np.stack([np.asanyarray(element) for element in elements])
+        except ValueError:
+            # The entries don't have the same shape
+            self._append_objects(elements)
+            return
+        self._append_array(stacked)
+
+    def set(self, data: Iterable[BufferEntry]) -> None:
+        """
+        Sets the entries of this field to the input data
+        :param data: The BufferEntry list (or stacked array) to be set.
+        """
+        if not self._owns_data:
+            self._data = None
+        self._start, self._end = 0, 0
+        self._owns_data = True
+        self.extend(data)
+
+    def take(self, indices: np.ndarray) -> "ColumnarAgentBufferField":
+        """
+        Gathers the entries at indices into a new field with one fancy-indexing operation.
+        :param indices: The indices of the entries to gather.
+        """
+        field = ColumnarAgentBufferField()
+        field.padding_value = self.padding_value
+        if self._data is not None:
+            field._data = self.values[indices]
+            field._end = len(field._data)
+        return field
+
+    def reorder(self, indices: np.ndarray) -> None:
+        """
+        Replaces the entries of this field by the entries at indices, in place.
+        :param indices: The indices of the entries to keep, in their new order.
+        """
+        if self._data is None:
+            return
+        reordered = self.values[indices]
+        if self._owns_data and len(reordered) <= self.capacity:
+            self._data[: len(reordered)] = reordered
+            self._start, self._end = 0, len(reordered)
+        else:
+            self._data = reordered
+            self._start, self._end = 0, len(reordered)
+            self._owns_data = True
+
+    def discard_oldest(self, count: int) -> None:
+        """
+        Removes the first count entries of this field by moving the read head.
+        :param count: The number of entries to remove.
+        """
+        self._start = min(self._start + max(count, 0), self._end)
+
+    def get_batch(
+        self,
+        batch_size: int = None,
+        training_length: Optional[int] = 1,
+        sequential: bool = True,
+    ) -> Union[np.ndarray, List[BufferEntry]]:
+        """
+        Retrieve the last batch_size elements of length training_length.
+        See AgentBufferField.get_batch for the meaning of the arguments. Returns a numpy array,
+        or a list if this field contains List[np.ndarray].
+        """
+        if training_length is None:
+            training_length = 1
+        length = len(self)
+        values = self.values
+        if sequential:
+            leftover = length % training_length
+            max_batches = length // training_length + 1 * (leftover != 0)
+            if batch_size is None:
+                batch_size = max_batches
+            if batch_size > max_batches:
+                raise BufferException(
+                    "The batch size and training length requested for get_batch where"
+                    " too large given the current number of data points."
+                )
+            if batch_size * training_length > length:
+                n_padding = training_length - leftover
+                if self.contains_lists:
+                    return list(values) + [[] for _ in range(n_padding)]
+                # We want to duplicate the last value in the array, multiplied by the padding_value.
+                padding = (
+                    np.asarray(values[-1:], dtype=np.float32) * self.padding_value
+                )
+                return np.concatenate(
+                    [values, np.repeat(padding, n_padding, axis=0)], axis=0
+                )
+            batch = values[length - batch_size * training_length :]
+        else:
+            if batch_size is None:
+                batch_size = length - training_length + 1
+            if (length - training_length + 1) < batch_size:
+                raise BufferException(
+                    "The batch size and training length requested for get_batch where"
+                    " too large given the current number of data points."
+                )
+            ends = np.arange(length - batch_size + 1, length + 1)
+            batch = values[
+                (ends[:, np.newaxis] + np.arange(-training_length, 0)).ravel()
+            ]
+        return list(batch) if self._is_object else batch
+
+    def reset_field(self) -> None:
+        """
+        Resets the ColumnarAgentBufferField, keeping its storage for reuse.
+        """
+        if not self._owns_data:
+            self._data = None
+            self._owns_data = True
+        self._start, self._end = 0, 0
+
+    def padded_to_batch(
+        self, pad_value: np.float = 0, dtype: np.dtype = np.float32
+    ) -> Union[np.ndarray, List[np.ndarray]]:
+        """
+        See AgentBufferField.padded_to_batch. For fields that don't contain lists, this is
+        a single cast of the underlying storage.
+        """
+        if not self._is_object:
+            return self.values.astype(dtype, copy=False)
+        if not self.contains_lists:
+            return np.asanyarray(list(self.values), dtype=dtype)
+        return AgentBufferField(list(self.values)).padded_to_batch(pad_value, dtype)
+
+    def to_ndarray(self):
+        """
+        Returns the ColumnarAgentBufferField as an ndarray.
+        """
+        return np.array(list(self.values)) if self._is_object else self.values.copy()
+
+
 class AgentBuffer(MutableMapping):
     """
     AgentBuffer contains a dictionary of AgentBufferFields. Each agent has his own AgentBuffer.
@@ -261,11 +583,18 @@ class AgentBuffer(MutableMapping):
     # This should be off for training, but enabled for testing
     CHECK_KEY_TYPES_AT_RUNTIME = False
 
-    def __init__(self):
+    def __init__(self, columnar: bool = False):
+        """
+        :param columnar: If True, store each field in a ColumnarAgentBufferField, i.e. in one
+            contiguous numpy array, instead of a list of numpy arrays. This makes shuffling,
+            sampling and truncating large buffers much cheaper.
+        """
         self.last_brain_info = None
         self.last_take_action_outputs = None
+        self.columnar = columnar
+        self._field_type = ColumnarAgentBufferField if columnar else AgentBufferField
         self._fields: DefaultDict[AgentBufferKey, AgentBufferField] = defaultdict(
-            AgentBufferField
+            self._field_type
         )
 
     def __str__(self):
@@ -396,8 +725,14 @@ class AgentBuffer(MutableMapping):
             )
         s = np.arange(len(self[key_list[0]]) // sequence_length)
         np.random.shuffle(s)
+        indices = (
+            s[:, np.newaxis] * sequence_length + np.arange(sequence_length)
+        ).ravel()
         for key in key_list:
             buffer_field = self[key]
+            if isinstance(buffer_field, ColumnarAgentBufferField):
+                buffer_field.reorder(indices)
+                continue
             tmp: List[np.ndarray] = []
             for i in s:
                 tmp += buffer_field[i * sequence_length : (i + 1) * sequence_length]
@@ -410,9 +745,9 @@ class AgentBuffer(MutableMapping):
         :param end: Ending index of buffer.
         :return: Dict of mini batch.
         """
-        mini_batch = AgentBuffer()
+        mini_batch = AgentBuffer(columnar=self.columnar)
         for key, field in self._fields.items():
-            # slicing AgentBufferField returns a List[Any}
+            # slicing AgentBufferField returns a List[Any}, slicing a ColumnarAgentBufferField a view
             mini_batch[key] = field[start:end]  # type: ignore
         return mini_batch
 
@@ -426,15 +761,19 @@ class AgentBuffer(MutableMapping):
             Number of sequences to sample will be batch_size/sequence_length.
         """
         num_seq_to_sample = batch_size // sequence_length
-        mini_batch = AgentBuffer()
+        mini_batch = AgentBuffer(columnar=self.columnar)
         buff_len = self.num_experiences
         num_sequences_in_buffer = buff_len // sequence_length
         start_idxes = (
             np.random.randint(num_sequences_in_buffer, size=num_seq_to_sample)
             * sequence_length
         )  # Sample random sequence starts
+        indices = (start_idxes[:, np.newaxis] + np.arange(sequence_length)).ravel()
         for key in self:
             buffer_field = self[key]
+            if isinstance(buffer_field, ColumnarAgentBufferField):
+                mini_batch[key] = buffer_field.take(indices)
+                continue
             mb_list = (buffer_field[i : i + sequence_length] for i in start_idxes)
             # See comparison of ways to make a list from a list of lists here:
             # https://stackoverflow.com/questions/952914/how-to-make-a-flat-list-out-of-list-of-lists
@@ -458,7 +797,7 @@ class AgentBuffer(MutableMapping):
         with h5py.File(file_object, "r") as read_file:
             for key in list(read_file.keys()):
                 decoded_key = self._decode_key(key)
-                self[decoded_key] = AgentBufferField()
+                self[decoded_key] = self._field_type()
                 # extend() will convert the numpy array's first dimension into list
                 self[decoded_key].extend(read_file[key][()])
 
@@ -467,7 +806,8 @@ class AgentBuffer(MutableMapping):
         Truncates the buffer to a certain length.
 
         This can be slow for large buffers. We compensate by cutting further than we need to, so that
-        we're not truncating at each update. Note that we must truncate an integer number of sequence_lengths
+        we're not truncating at each update. Note that we must truncate an integer number of sequence_lengths.
+        For columnar fields, this only moves the read head.
         param: max_length: The length at which to truncate the buffer.
         """
         current_length = self.num_experiences
@@ -475,7 +815,10 @@ class AgentBuffer(MutableMapping):
         max_length -= max_length % sequence_length
         if current_length > max_length:
             for _key in self.keys():
-                self[_key][:] = self[_key][current_length - max_length :]
+                if isinstance(self[_key], ColumnarAgentBufferField):
+                    self[_key].discard_oldest(current_length - max_length)
+                else:
+                    self[_key][:] = self[_key][current_length - max_length :]
 
     def resequence_and_append(
         self,
@@ -2,6 +2,7 @@ import numpy as np
 from mlagents.trainers.buffer import (
     AgentBuffer,
     AgentBufferField,
+    ColumnarAgentBufferField,
     BufferKey,
     ObservationKeyPrefix,
     RewardSignalKeyPrefix,
@@ -280,3 +281,107 @@ def test_buffer_save_load():
     assert len(original) == len(loaded)
     for k in original.keys():
         assert np.allclose(original[k], loaded[k])
+
+
+def test_columnar_buffer_matches_list_buffer():
+    list_buffer = AgentBuffer()
+    columnar_buffer = AgentBuffer(columnar=True)
+    for agent_id in range(1, 4):
+        construct_fake_buffer(agent_id).resequence_and_append(
+            list_buffer, batch_size=None, training_length=4
+        )
+        construct_fake_buffer(agent_id).resequence_and_append(
+            columnar_buffer, batch_size=None, training_length=4
+        )
+    assert columnar_buffer.num_experiences == list_buffer.num_experiences == 36
+    for key in list_buffer.keys():
+        assert isinstance(columnar_buffer[key], ColumnarAgentBufferField)
+    obs_key = ObsUtil.get_name_at(0)
+    assert np.array_equal(columnar_buffer[obs_key], np.array(list_buffer[obs_key]))
+    # Group entries are kept as lists, including the padding
+    group_field = columnar_buffer[BufferKey.GROUP_CONTINUOUS_ACTION]
+    assert group_field.contains_lists
+    assert len(group_field[0]) == 3 and len(group_field[-1]) == 0
+
+    for training_length, sequential in [(1, True), (4, True), (5, True), (3, False)]:
+        list_batch = list_buffer[obs_key].get_batch(
+            training_length=training_length, sequential=sequential
+        )
+        columnar_batch = columnar_buffer[obs_key].get_batch(
+            training_length=training_length, sequential=sequential
+        )
+        assert np.array_equal(np.array(list_batch), columnar_batch)
+
+    padded = group_field.padded_to_batch(pad_value=np.nan)
+    expected = list_buffer[BufferKey.GROUP_CONTINUOUS_ACTION].padded_to_batch(
+        pad_value=np.nan
+    )
+    for columnar_arr, list_arr in zip(padded, expected):
+        assert np.array_equal(columnar_arr, list_arr, equal_nan=True)
+
+
+def test_columnar_buffer_shuffle_sample_truncate():
+    update_buffer = AgentBuffer(columnar=True)
+    for agent_id in range(1, 3):
+        construct_fake_buffer(agent_id).resequence_and_append(
+            update_buffer, batch_size=None, training_length=1
+        )
+    obs_key = ObsUtil.get_name_at(0)
+    # The observation and the action of a step are consistent, so they must stay aligned.
+    update_buffer.shuffle(sequence_length=3)
+    assert update_buffer.num_experiences == 18
+    obs = np.array(update_buffer[obs_key])
+    actions = np.array(update_buffer[BufferKey.CONTINUOUS_ACTION])
+    assert np.array_equal(obs[:, :2] + 3, actions)
+    assert sorted(obs[:, 0]) == sorted(
+        100 * agent + 10 * step + 1 for agent in (1, 2) for step in range(9)
+    )
+    # Sequences stay together when shuffling
+    assert np.all(obs[1::3, 0] - obs[0::3, 0] == 10)
+
+    mb = update_buffer.sample_mini_batch(batch_size=6, sequence_length=3)
+    mb_obs = np.array(mb[obs_key])
+    assert mb_obs.shape == (6, 3)
+    assert np.array_equal(mb_obs[:, :2] + 3, np.array(mb[BufferKey.CONTINUOUS_ACTION]))
+
+    # Minibatches are views, and writing to them doesn't change the buffer
+    mini_batch = update_buffer.make_mini_batch(0, 4)
+    assert np.shares_memory(mini_batch[obs_key].values, update_buffer[obs_key].values)
+    mini_batch[obs_key][0] = np.zeros(3)
+    assert np.array_equal(update_buffer[obs_key][0], obs[0])
+
+    last_obs = obs[-5:]
+    capacity = update_buffer[obs_key].capacity
+    update_buffer.truncate(5)
+    assert update_buffer.num_experiences == 5
+    assert np.array_equal(np.array(update_buffer[obs_key]), last_obs)
+    assert update_buffer[obs_key].capacity == capacity
+    # New entries reuse the space freed by truncation
+    construct_fake_buffer(3).resequence_and_append(
+        update_buffer, batch_size=None, training_length=1
+    )
+    assert update_buffer.num_experiences == 14
+    assert update_buffer[obs_key].capacity == capacity
+    assert np.array_equal(np.array(update_buffer[obs_key])[:5], last_obs)
+
+    update_buffer.reset_agent()
+    assert update_buffer.num_experiences == 0
+
+
+def test_columnar_buffer_save_load():
+    original = AgentBuffer(columnar=True)
+    construct_fake_buffer(3).resequence_and_append(
+        original, key_list=[ObsUtil.get_name_at(0), BufferKey.CONTINUOUS_ACTION]
+    )
+    import io
+
+    write_buffer = io.BytesIO()
+    original.save_to_file(write_buffer)
+
+    loaded = AgentBuffer(columnar=True)
+    loaded.load_from_file(write_buffer)
+
+    assert len(original) == len(loaded)
+    for k in original.keys():
+        assert isinstance(loaded[k], ColumnarAgentBufferField)
+        assert np.allclose(original[k], loaded[k])
@@ -46,7 +46,7 @@ class RLTrainer(Trainer):
         self.collected_rewards: Dict[str, Dict[str, int]] = {
             "environment": defaultdict(lambda: 0)
         }
-        self.update_buffer: AgentBuffer = AgentBuffer()
+        self.update_buffer: AgentBuffer = AgentBuffer(columnar=True)
         self._stats_reporter.add_property(
             StatsPropertyType.HYPERPARAMETERS, self.trainer_settings.as_dict()
         )